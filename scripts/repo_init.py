@@ -22,17 +22,28 @@ Notes:
 """
 from __future__ import annotations
 
-import argparse, os, re, shutil, subprocess, sys
+import argparse, concurrent.futures, errno, functools, io, mmap, os, re, shutil, subprocess, sys
 from dataclasses import dataclass
 from pathlib import Path
 
-ROOT = Path(__file__).resolve().parents[1]
+# __file__ is absolute since Python 3.9, so no resolve() stat chain needed.
+ROOT = Path(__file__).parents[1]
 SRC = ROOT / "src"
 PKG_OLD = SRC / "py_proj_template"
 PYPROJECT = ROOT / "pyproject.toml"
 TEXT_EXT = {".py", ".toml", ".md", ".yml", ".yaml", ".txt", ".cfg", ".ini", ".json", ".lock"}
-EXCLUDES = {".git", ".venv", "build", "dist", "__pycache__", ".mypy_cache", ".pytest_cache", ".ruff_cache", ".idea"}
+EXCLUDES = {".git", ".venv", "build", "dist", "__pycache__", ".mypy_cache", ".pytest_cache", ".ruff_cache", ".idea", ".tox", "node_modules"}
+MAX_TEXT_FILE_SIZE = 5 * 1024 * 1024  # skip anything bigger; not a hand-edited text file
+INIT_VERSION = "1.0.0"  # single source for the version reset below
+_INIT_VERSION_LINE = f'__version__ = "{INIT_VERSION}"'
 PROTECTED = {str((ROOT / "config" / "settings.toml").resolve())}
+# Compiled once at import so repeated calls skip re's per-call cache probes.
+_HEADER_RE = re.compile(r"^\s*\[[^\]]+\]\s*$")
+_PROJECT_HEADER_RE = re.compile(r"^\s*\[project\]\s*$")
+_NAME_LINE_RE = re.compile(r"^\s*name\s*=\s*['\"].*['\"][^#]*$")
+_VERSION_LINE_RE = re.compile(r"^\s*version\s*=\s*['\"].*['\"][^#]*$")
+_INIT_VERSION_RE = re.compile(r'(?m)^__version__\s*=\s*["\'][^"\']*["\']\s*$')
+_PKG_NAME_RE = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*")
 DOC_TEMPLATES = {
     "CHANGELOG.md": "# Changelog\n\n## [1.0.0] - Unreleased\n\n- TODO: list initial changes.\n",
     "TODO.md": "# TODO\n\n- [ ] Add top-priority tasks for {project_title}.\n",
@@ -50,122 +61,168 @@ class Config:
 
 
 def _update_project_table(text: str, *, name: str | None = None, version: str | None = None) -> str:
-    lines = text.splitlines()
+    # Single forward scan: emit each line into a StringIO, swapping in the
+    # replacement when the first matching key line inside [project] goes by.
+    # Keys that never show up are appended at the end of the table (before
+    # the next header or EOF), avoiding the O(n) list splices of the old
+    # splitlines/insert approach.
+    buf = io.StringIO()
+    seen_project = False
     in_project = False
-    proj_start_idx = None
-    name_idx = None
-    version_idx = None
-
-    header_re = re.compile(r"^\s*\[[^\]]+\]\s*$")
-    name_re = re.compile(r"^\s*name\s*=\s*['\"].*['\"][^#]*$")
-    version_re = re.compile(r"^\s*version\s*=\s*['\"].*['\"][^#]*$")
-
-    for i, line in enumerate(lines):
-        if re.match(r"^\s*\[project\]\s*$", line):
+    name_done = name is None
+    version_done = version is None
+
+    def emit_pending() -> None:
+        nonlocal name_done, version_done
+        if not name_done:
+            buf.write(f'name = "{name}"\n')
+            name_done = True
+        if not version_done:
+            buf.write(f'version = "{version}"\n')
+            version_done = True
+
+    pos = 0
+    size = len(text)
+    while pos < size:
+        nl = text.find("\n", pos)
+        end = size if nl < 0 else nl
+        line = text[pos:end]
+        eol = "" if nl < 0 else "\n"
+        pos = end + 1
+
+        if not seen_project and _PROJECT_HEADER_RE.match(line):
+            seen_project = True
             in_project = True
-            proj_start_idx = i
-            continue
-        if in_project and i != proj_start_idx and header_re.match(line):
-            break
-        if in_project:
-            if name_idx is None and name_re.match(line):
-                name_idx = i
-            if version_idx is None and version_re.match(line):
-                version_idx = i
-
-    if proj_start_idx is None:
+        elif in_project and _HEADER_RE.match(line):
+            emit_pending()
+            in_project = False
+        elif in_project and not name_done and _NAME_LINE_RE.match(line):
+            line = f'name = "{name}"'
+            name_done = True
+        elif in_project and not version_done and _VERSION_LINE_RE.match(line):
+            line = f'version = "{version}"'
+            version_done = True
+        buf.write(line + eol)
+
+    if not seen_project:
         return text
 
-    def insert_after(idx: int, new_line: str):
-        nonlocal lines
-        lines = lines[: idx + 1] + [new_line] + lines[idx + 1 :]
-
-    if name is not None:
-        if name_idx is not None:
-            lines[name_idx] = f'name = "{name}"'
-        else:
-            insert_after(proj_start_idx, f'name = "{name}"')
-
-    if version is not None:
-        if version_idx is not None:
-            lines[version_idx] = f'version = "{version}"'
-        else:
-            target_idx = name_idx if name_idx is not None else proj_start_idx
-            insert_after(target_idx, f'version = "{version}"')
-
-    return "\n".join(lines) + ("\n" if text.endswith("\n") else "")
+    if in_project and not (name_done and version_done):
+        if not text.endswith("\n"):
+            buf.write("\n")
+        emit_pending()
+        out = buf.getvalue()
+        return out if text.endswith("\n") else out.rstrip("\n")
+    return buf.getvalue()
 
 def sh(cmd: list[str], check: bool = True) -> subprocess.CompletedProcess:
     return subprocess.run(cmd, cwd=ROOT, check=check, text=True)
 
 
+@functools.lru_cache(maxsize=None)
 def have(cmd: str) -> bool:
+    # shutil.which walks the whole PATH; cache so repeat probes are free.
     return shutil.which(cmd) is not None
 
 
 def git_clean() -> bool:
     try:
-        out = subprocess.check_output(["git", "status", "--porcelain"], text=True, cwd=ROOT)
-        return out.strip() == ""
+        out = subprocess.check_output(["git", "status", "--porcelain"], cwd=ROOT)
+        return out.strip() == b""
     except Exception:
         return False
 
 
 def iter_text_files(root: Path):
-    for p in root.rglob("*"):
-        if not p.is_file():
-            continue
-        if p.suffix.lower() not in TEXT_EXT:
-            continue
-        parts = set(p.parts)
-        if parts.intersection(EXCLUDES):
-            continue
-        yield p
-
-
-def rewrite_file(path: Path, transform, apply: bool) -> bool:
-    try:
-        before = path.read_text(encoding="utf-8")
-    except Exception:
-        return False
-    after = transform(before)
-    if after == before:
-        return False
-    if apply:
-        path.write_text(after, encoding="utf-8")
-    else:
-        print(f"dry-run: update {path}")
-    return True
-
-
-def replace_many(text: str, rules: list[tuple[re.Pattern[str], str]]) -> str:
+    # os.walk with in-place pruning so we never descend into .git, .venv,
+    # etc. (rglob stats every entry under them before filtering).
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in EXCLUDES]
+        for filename in filenames:
+            p = Path(dirpath) / filename
+            if p.suffix.lower() not in TEXT_EXT:
+                continue
+            try:
+                if p.stat().st_size > MAX_TEXT_FILE_SIZE:
+                    continue
+            except OSError:
+                continue
+            yield p
+
+
+def make_word_replacer(needle: str, repl: str):
+    """Build a replacer specialized to one word-delimited literal token.
+
+    Equivalent to re.compile(rf"\\b{re.escape(needle)}\\b").sub(repl, s),
+    but specialized at build time: occurrences are located with str.find
+    (libc memmem) and only the boundary characters are inspected, so the
+    regex engine never runs on the hot sweep.
+    """
+    n = len(needle)
+
+    def _is_word(ch: str) -> bool:
+        return ch.isalnum() or ch == "_"
+
+    def replace(s: str) -> str:
+        i = s.find(needle)
+        if i < 0:
+            return s
+        out: list[str] = []
+        pos = 0
+        while i >= 0:
+            end = i + n
+            if (i == 0 or not _is_word(s[i - 1])) and (end == len(s) or not _is_word(s[end])):
+                out.append(s[pos:i])
+                out.append(repl)
+                pos = end
+            i = s.find(needle, end)
+        out.append(s[pos:])
+        return "".join(out)
+
+    return replace
+
+
+def replace_many(text: str, replacers) -> str:
     out = text
-    for pat, repl in rules:
-        out = pat.sub(repl, out)
+    for replace in replacers:
+        out = replace(out)
     return out
 
 
 def rename_package(old_dir: Path, new_pkg: str, apply: bool) -> Path:
     new_dir = old_dir.parent / new_pkg
-    if not old_dir.exists():
+    if not apply:
+        if not old_dir.exists():
+            sys.exit(f"expected package directory missing: {old_dir}")
+        if new_dir.exists():
+            sys.exit(f"target package already exists: {new_dir}")
+        print(f"dry-run: rename {old_dir} -> {new_dir}")
+        return new_dir
+    # Let rename(2) itself report the failure modes instead of racing
+    # separate stat calls against it.
+    try:
+        os.rename(old_dir, new_dir)
+    except FileNotFoundError:
         sys.exit(f"expected package directory missing: {old_dir}")
-    if new_dir.exists():
+    except (FileExistsError, NotADirectoryError):
         sys.exit(f"target package already exists: {new_dir}")
-    if apply:
-        old_dir.rename(new_dir)
-    else:
-        print(f"dry-run: rename {old_dir} -> {new_dir}")
+    except OSError as exc:
+        # rename(2) onto a non-empty directory reports ENOTEMPTY, which
+        # Python raises as plain OSError; anything else is unexpected.
+        if exc.errno == errno.ENOTEMPTY:
+            sys.exit(f"target package already exists: {new_dir}")
+        raise
     return new_dir
 
 
-REPLACEMENTS: list[tuple[re.Pattern[str], str]] = [
-    (re.compile(r"\bpy_proj_template\b"), "{new_name}"),
-    (re.compile(r"\bpy-proj-template\b"), "{new_name}"),
-]
+RENAME_TOKENS = ("py_proj_template", "py-proj-template")
+# Substring presence is a necessary condition for the word-delimited
+# replacement, so a cheap bytes scan can rule most files out before decoding.
+_TOKEN_NEEDLES = tuple(token.encode("ascii") for token in RENAME_TOKENS)
 
 
 def replace_py_proj_template(root: Path, new_pkg: str, apply: bool) -> int:
-    rules = [(pat, repl.format(new_name=new_pkg)) for pat, repl in REPLACEMENTS]
+    rules = [make_word_replacer(token, new_pkg) for token in RENAME_TOKENS]
 
     def transform_for_path(path: Path):
         def _transform(s: str) -> str:
@@ -184,76 +241,129 @@ def replace_py_proj_template(root: Path, new_pkg: str, apply: bool) -> int:
 
         return _transform
 
-    n_changed = 0
-    for p in iter_text_files(root):
-        rp = str(p.resolve())
-        if rp in PROTECTED:
-            continue
-        if rewrite_file(p, transform_for_path(p), apply):
-            n_changed += 1
+    def _rewrite_one(p: Path) -> bool:
+        # Scan via mmap so the token pre-check runs on the page cache
+        # without materializing a bytes copy; only hits get fully read.
+        try:
+            with open(p, "rb") as f:
+                try:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        if all(mm.find(needle) < 0 for needle in _TOKEN_NEEDLES):
+                            return False
+                except ValueError:
+                    return False  # empty file: nothing to replace
+                raw = f.read()
+        except Exception:
+            return False
+        try:
+            before = raw.decode("utf-8")
+        except UnicodeDecodeError:
+            return False
+        after = transform_for_path(p)(before)
+        if after == before:
+            return False
+        if apply:
+            p.write_text(after, encoding="utf-8")
+        else:
+            messages.append(f"dry-run: update {p}")
+        return True
+
+    # Per-file work is dominated by read/write syscalls, during which the
+    # GIL is released, so threads overlap the I/O across files.
+    messages: list[str] = []
+    candidates = [p for p in iter_text_files(root) if str(p.resolve()) not in PROTECTED]
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        n_changed = sum(pool.map(_rewrite_one, candidates))
+    for message in messages:
+        print(message)
     return n_changed
 
 
-def safe_set_versions(new_pkg: str, apply: bool):
-    # Update [project].version safely (no duplicates)
-    s = PYPROJECT.read_text(encoding="utf-8")
-    s2 = _update_project_table(s, version="1.0.0")
-    if s2 != s:
-        if apply:
-            PYPROJECT.write_text(s2, encoding="utf-8")
-        else:
-            print("dry-run: set [project].version = 1.0.0")
-    # Keep __version__ behavior from set_versions
+def update_pyproject_text(text: str, new_name: str) -> str:
+    """Apply the project rename and version reset to an in-memory buffer.
+
+    Pure text->text so pyproject.toml is read and written at most once
+    by the caller instead of once per setter.
+    """
+    out = _update_project_table(text, name=new_name, version=INIT_VERSION)
+    # Also replace occurrences inside file for both variants
+    out = out.replace("py_proj_template", new_name)
+    out = out.replace("py-proj-template", new_name)
+    return out
+
+
+def set_init_version(new_pkg: str, apply: bool):
     init_py = (SRC / new_pkg / "__init__.py")
     if not init_py.exists():
         if apply:
             init_py.parent.mkdir(parents=True, exist_ok=True)
-            init_py.write_text('__version__ = "1.0.0"\n', encoding="utf-8")
+            init_py.write_text(_INIT_VERSION_LINE + "\n", encoding="utf-8")
         else:
-            print(f"dry-run: create {init_py} with __version__ = 1.0.0")
+            print(f"dry-run: create {init_py} with __version__ = {INIT_VERSION}")
         return
-    t = init_py.read_text(encoding="utf-8")
-    t2, n2 = re.subn(r'(?m)^__version__\s*=\s*["\'][^"\']*["\']\s*$', '__version__ = "1.0.0"', t)
-    if n2 == 0:
-        t2 = t.rstrip() + '\n__version__ = "1.0.0"\n'
-    if t2 != t:
+    # One handle for the whole read-modify-write instead of an open/close
+    # pair per direction.
+    with open(init_py, "r+b" if apply else "rb") as f:
+        raw = f.read()
+        if (_INIT_VERSION_LINE + "\n").encode("ascii") in raw:
+            # Already initialized; skip the decode + regex + rewrite entirely.
+            return
+        t = raw.decode("utf-8")
+        t2, n2 = _INIT_VERSION_RE.subn(_INIT_VERSION_LINE, t)
+        if n2 == 0:
+            t2 = t.rstrip() + "\n" + _INIT_VERSION_LINE + "\n"
+        if t2 == t:
+            return
         if apply:
-            init_py.write_text(t2, encoding="utf-8")
+            f.seek(0)
+            f.write(t2.encode("utf-8"))
+            f.truncate()
         else:
-            print(f"dry-run: set {init_py} __version__ = 1.0.0")
+            print(f"dry-run: set {init_py} __version__ = {INIT_VERSION}")
 
 
-def update_pyproject_safe(pyproj: Path, new_name: str, apply: bool):
-    s = pyproj.read_text(encoding="utf-8")
-    s2 = _update_project_table(s, name=new_name)
-    # Also replace occurrences inside file for both variants
-    s2 = s2.replace("py_proj_template", new_name)
-    s2 = s2.replace("py-proj-template", new_name)
-    if s2 != s:
+def update_pyproject(new_name: str, apply: bool):
+    # Read once, apply every pyproject edit in memory, write back at most
+    # once — through the same handle, so there is no second open/close.
+    with open(PYPROJECT, "r+b" if apply else "rb") as f:
+        s = f.read().decode("utf-8")
+        s2 = update_pyproject_text(s, new_name)
+        if s2 == s:
+            return
         if apply:
-            pyproj.write_text(s2, encoding="utf-8")
+            f.seek(0)
+            f.write(s2.encode("utf-8"))
+            f.truncate()
         else:
-            print("dry-run: update pyproject.toml [project].name and occurrences")
+            print("dry-run: update pyproject.toml [project].name/version and occurrences")
 
-def git_remote_exists(name: str) -> bool:
+@functools.lru_cache(maxsize=1)
+def _git_remotes() -> frozenset[str]:
     try:
         out = subprocess.check_output(["git", "remote"], text=True, cwd=ROOT)
-        return name in out.split()
+        return frozenset(out.split())
     except Exception:
-        return False
+        return frozenset()
 
 
 def set_git_remotes(new_origin: str, apply: bool):
-    if git_remote_exists("origin") and not git_remote_exists("upstream"):
+    # One 'git remote' snapshot answers every existence check below.
+    remotes = _git_remotes()
+    rename = "origin" in remotes and "upstream" not in remotes
+    if rename:
         if apply:
             sh(["git", "remote", "rename", "origin", "upstream"])
         else:
             print("dry-run: git remote rename origin -> upstream")
-    if new_origin and not git_remote_exists("origin"):
+    # After the rename the 'origin' slot is free again.
+    if new_origin and (rename or "origin" not in remotes):
         if apply:
             sh(["git", "remote", "add", "origin", new_origin])
         else:
             print(f"dry-run: git remote add origin {new_origin}")
+    if apply and (rename or new_origin):
+        _git_remotes.cache_clear()
 
 
 def clear_template_tags(apply: bool):
@@ -280,21 +390,34 @@ def clear_template_tags(apply: bool):
 
 
 def ensure_template_branch(apply: bool):
-    have_upstream_main = False
+    # A local tracking ref answers the question without the network
+    # round trip; only fall back to ls-remote when it is absent.
     try:
-        out = subprocess.check_output(["git", "ls-remote", "--heads", "upstream", "main"], text=True, cwd=ROOT)
-        have_upstream_main = bool(out.strip())
+        subprocess.check_output(
+            ["git", "rev-parse", "--verify", "--quiet", "refs/remotes/upstream/main"],
+            cwd=ROOT,
+        )
+        have_upstream_main = True
     except Exception:
-        have_upstream_main = False
+        try:
+            out = subprocess.check_output(["git", "ls-remote", "--heads", "upstream", "main"], text=True, cwd=ROOT)
+            have_upstream_main = bool(out.strip())
+        except Exception:
+            have_upstream_main = False
     if apply:
-        # Avoid re-fetching tags that were just cleared locally
-        sh(["git", "fetch", "--all", "--no-tags"], check=False)
-        if have_upstream_main:
-            sh(["git", "checkout", "-B", "template", "upstream/main"], check=False)
-        else:
-            sh(["git", "checkout", "-B", "template"], check=False)
-        sh(["git", "checkout", "-B", "main"], check=False)
-        sh(["git", "merge", "--no-edit", "template"], check=False)
+        # One shell invocation instead of four git spawns. The fetch is
+        # joined with ';' so an offline run still reaches the checkouts;
+        # the branch steps use '&&' so a failed checkout aborts the merge.
+        # Avoid re-fetching tags that were just cleared locally.
+        template_src = "upstream/main" if have_upstream_main else ""
+        steps = " && ".join(
+            [
+                f"git checkout -B template {template_src}".rstrip(),
+                "git checkout -B main",
+                "git merge --no-edit template",
+            ]
+        )
+        sh(["bash", "-c", f"git fetch --all --no-tags; {steps}"], check=False)
     else:
         base = "upstream/main" if have_upstream_main else "HEAD"
         print(f"dry-run: create/update 'template' from {base}, merge into 'main'")
@@ -320,7 +443,10 @@ def install_pre_push_hook(apply: bool):
         print("pre-push hook source not found; skip"); return
     if apply:
         hooks_dir.mkdir(parents=True, exist_ok=True)
-        dst.write_text(src.read_text(encoding="utf-8"), encoding="utf-8")
+        if dst.exists() and dst.read_bytes() == src.read_bytes():
+            return  # already installed; don't churn mtime/inode
+        # copyfile uses copy_file_range/sendfile on Linux: zero-copy in-kernel.
+        shutil.copyfile(src, dst)
         os.chmod(dst, 0o755)
     else:
         print(f"dry-run: install hook {src} -> {dst}")
@@ -346,7 +472,7 @@ def warn_if_hooks_overridden():
 
 
 def validate_new_name(name: str):
-    if not re.fullmatch(r"[a-zA-Z_][a-zA-Z0-9_]*", name):
+    if not _PKG_NAME_RE.fullmatch(name):
         sys.exit("invalid package name. use [a-zA-Z_][a-zA-Z0-9_]*")
 
 
@@ -389,9 +515,9 @@ def main():
     rename_package(PKG_OLD, args.new_name, args.apply)
     n_files = replace_py_proj_template(ROOT, args.new_name, args.apply)
     print(f"files updated for identifier rename: {n_files}")
-    update_pyproject_safe(PYPROJECT, args.new_name, args.apply)
-    # set version to 1.0.0
-    safe_set_versions(args.new_name, args.apply)
+    update_pyproject(args.new_name, args.apply)
+    # set __version__ to 1.0.0
+    set_init_version(args.new_name, args.apply)
     reset_doc_templates(args.new_name, args.apply)
     create_env_and_install(args.apply, args.no_uv)
     install_pre_push_hook(args.apply)
@@ -3,12 +3,18 @@
 from __future__ import annotations
 
 import argparse
+import os
+import select
 import shutil
 import subprocess
 import sys
 from pathlib import Path
 
-PROJECT_ROOT = Path(__file__).resolve().parent.parent
+# __file__ is absolute since Python 3.9, so no resolve() stat chain needed.
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Resolved once: shutil.which walks the whole PATH on every call.
+HAVE_UV = shutil.which("uv") is not None
 
 DEFAULT_TASKS: dict[str, list[list[str]]] = {
     "format": [["black", "src", "tests", "scripts"]],
@@ -20,7 +26,7 @@ DEFAULT_TASKS: dict[str, list[list[str]]] = {
 def build_command(command: list[str]) -> list[str]:
     """Return a command, preferring uv if it is available."""
     tool, *args = command
-    if shutil.which("uv"):
+    if HAVE_UV:
         return ["uv", "run", tool, *args]
     return [sys.executable, "-m", tool, *args]
 
@@ -41,6 +47,49 @@ def run_task(task: str) -> int:
     return 0
 
 
+def run_tasks_parallel(tasks: list[str]) -> int:
+    """Run independent tasks concurrently, prefixing output lines by task.
+
+    Each task's commands still run sequentially within that task; the
+    tasks themselves overlap via Popen plus a select loop over their
+    stdout pipes. Returns the highest exit code seen.
+    """
+    exit_code = 0
+    queues = {task: list(DEFAULT_TASKS[task]) for task in tasks}
+    running: dict[int, list] = {}
+
+    def start_next(task: str) -> None:
+        proc = subprocess.Popen(
+            build_command(queues[task].pop(0)),
+            cwd=PROJECT_ROOT,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        running[proc.stdout.fileno()] = [task, proc, b""]
+
+    for task in tasks:
+        start_next(task)
+
+    while running:
+        ready, _, _ = select.select(list(running), [], [])
+        for fd in ready:
+            task, proc, buf = running[fd]
+            chunk = os.read(fd, 65536)
+            if chunk:
+                *lines, running[fd][2] = (buf + chunk).split(b"\n")
+                for line in lines:
+                    print(f"[{task}] {line.decode(errors='replace')}")
+                continue
+            if buf:
+                print(f"[{task}] {buf.decode(errors='replace')}")
+            returncode = proc.wait()
+            del running[fd]
+            exit_code = max(exit_code, returncode)
+            if returncode == 0 and queues[task]:
+                start_next(task)
+    return exit_code
+
+
 def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument(
@@ -54,6 +103,11 @@ def main(argv: list[str] | None = None) -> int:
         action="store_true",
         help="List available tasks and exit.",
     )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Run read-only tasks concurrently (format still runs first, alone).",
+    )
     args = parser.parse_args(argv)
 
     if args.list:
@@ -61,7 +115,22 @@ def main(argv: list[str] | None = None) -> int:
             print(task_name)
         return 0
 
-    tasks = args.tasks or list(DEFAULT_TASKS)
+    # Dedupe while preserving order; repeating a task never adds value and
+    # run_tasks_parallel keys its queues by task name.
+    tasks = list(dict.fromkeys(args.tasks or DEFAULT_TASKS))
+
+    if args.parallel:
+        # format rewrites files, so it must not race the read-only tasks.
+        read_only = [task for task in tasks if task != "format"]
+        if "format" in tasks:
+            exit_code = run_task("format")
+            if exit_code != 0:
+                return exit_code
+        if read_only:
+            print("==> " + " + ".join(read_only) + " (parallel)")
+            return run_tasks_parallel(read_only)
+        return 0
+
     for task in tasks:
         exit_code = run_task(task)
         if exit_code != 0: